@@ -19,9 +19,11 @@ import itertools
 import scipy.optimize
 
 from collections import defaultdict
+from scipy.spatial.distance import cdist
 
 from autografs.utils.sbu import read_sbu_database
 from autografs.utils.sbu import SBU
+from autografs.utils.sbu import get_dummy_mask
 from autografs.utils.topology import read_topologies_database
 from autografs.utils.topology import Topology
 from autografs.framework import Framework
@@ -93,6 +95,11 @@ class Autografs(object):
         self.topology = None
         # container for current sbu mapping
         self.sbu_dict = None
+        # centered positions and sizes of the current
+        # topology fragments, filled during alignment
+        self._fragment_cache = {}
+        # analyzed SBU objects, by database name
+        self._sbu_cache = {}
         logger.info("")
         return None
 
@@ -137,6 +144,7 @@ class Autografs(object):
                             atoms=topology_atoms)
         # store it for use as attribute
         self.topology = topology
+        self._fragment_cache = {}
         logger.info("")
         return None
 
@@ -206,8 +214,8 @@ class Autografs(object):
             for k, v in sbu_dict.items():
                 if not isinstance(v, SBU):
                     if not isinstance(v, ase.Atoms):
-                        name = str(v)
-                        v = self.sbu[name].copy()
+                        sbu_dict[k] = self._get_sbu(str(v)).copy()
+                        continue
                     elif "name" in v.info.keys():
                         name = v.info["name"]
                     else:
@@ -242,6 +250,24 @@ class Autografs(object):
         logger.info("")
         return aligned
 
+    def _get_sbu(self,
+                 name):
+        """Return the analyzed SBU of a database entry.
+
+        The SBU is built once per entry and shared between calls:
+        callers that modify it have to work on a copy.
+        """
+        atoms = self.sbu[name]
+        # rebuild if the database entry was replaced
+        if name in self._sbu_cache:
+            cached_atoms, sbu = self._sbu_cache[name]
+            if cached_atoms is atoms:
+                return sbu
+        sbu = SBU(name=name,
+                  atoms=atoms)
+        self._sbu_cache[name] = (atoms, sbu)
+        return sbu
+
     def get_topology(self,
                      topology_name):
         """Generates and return a Topology object
@@ -302,9 +328,8 @@ class Autografs(object):
                 name = str(name)
             else:
                 p = 1.0
-            # create the SBU object
-            sbu = SBU(name=name,
-                      atoms=self.sbu[name])
+            # get the SBU object
+            sbu = self._get_sbu(name)
             slots = self.topology.has_compatible_slots(sbu=sbu,
                                                        coercion=coercion)
             if not slots:
@@ -312,18 +337,17 @@ class Autografs(object):
             for slot in slots:
                 weights[slot].append(p)
                 by_shape[slot].append(sbu)
+        # no weights means same proba. normalized once per shape
+        probabilities = {shape: numpy.asarray(p)/numpy.sum(p)
+                         for shape, p in weights.items()}
         # now fill the choices
         sbu_dict = {}
         for index, shape in self.topology.shapes.items():
-            # here, should accept weights also
             shape = tuple(shape)
-            if shape not in by_shape.keys():
+            if shape not in by_shape:
                 logger.info("Unfilled slot at index {idx}".format(idx=index))
-            p = weights[shape]
-            # no weights means same proba
-            p /= numpy.sum(p)
             sbu_chosen = numpy.random.choice(by_shape[shape],
-                                             p=p).copy()
+                                             p=probabilities.get(shape)).copy()
             sbu_dict[index] = sbu_chosen
         return sbu_dict
 
@@ -333,7 +357,7 @@ class Autografs(object):
         """Return an aligned SBU.
 
         The SBU is rotated on top of the fragment
-        using the procrustes library within scipy.
+        by solving the orthogonal procrustes problem.
         a scaling factor is also calculated for all three
         cell vectors.
 
@@ -354,53 +378,71 @@ class Autografs(object):
             the size difference between the slot and the
             sbu.
         """
-        # first, we work with copies
-        fragment = fragment.copy()
         # normalize and center
-        fragment_cop = fragment.positions.mean(axis=0)
-        fragment.positions -= fragment_cop
+        fragment_cop, frag_pos, size_fragment = self._center_fragment(fragment)
         sbu.atoms.positions -= sbu.atoms.positions.mean(axis=0)
         # identify dummies in sbu
-        sbu_Xis = [x.index for x in sbu.atoms if x.symbol == "X"]
+        is_X, _ = get_dummy_mask(sbu.atoms)
         # get the scaling factor
-        sbu_pos = sbu.atoms.get_positions()
-        frag_pos = fragment.get_positions()
-        size_sbu = numpy.linalg.norm(sbu_pos[sbu_Xis], axis=1)
-        size_fragment = numpy.linalg.norm(frag_pos, axis=1)
+        X0 = sbu.atoms.positions[is_X]
+        size_sbu = numpy.linalg.norm(X0, axis=1)
         alpha_iso = size_sbu.mean()/size_fragment.mean()
         # initial scaling: isotropic.
-        fragment.positions = frag_pos.dot(numpy.eye(3)*alpha_iso)
+        frag_scaled = frag_pos * alpha_iso
         # getting the rotation matrix
-        X0 = sbu_pos[sbu_Xis]
-        X1 = fragment.get_positions()
+        X1 = frag_scaled
         # trick to get a well defined rotation even
         # when the object is highly symmetric or planar
         if X0.shape[0] > 5:
             X0 = self.get_vector_space(X0)
             X1 = self.get_vector_space(X1)
-        # use the scipy implementation
-        R, _ = scipy.linalg.orthogonal_procrustes(X0, X1)
-        sbu.atoms.positions = sbu.atoms.positions.dot(R)
+        # procrustes rotation from the SVD of the 3x3 covariance
+        U, _, Vt = numpy.linalg.svd(X0.T.dot(X1))
+        R = U.dot(Vt)
+        numpy.matmul(sbu.atoms.positions, R, out=sbu.atoms.positions)
         # now that the alignment is made, it is pssible
         # to refine a bit the scaling procedure
-        alpha = numpy.zeros(3)
-        for sbu_xi in sbu_Xis:
-            # find corresponding dummmies by distance
-            xixi = fragment.get_positions()-sbu.atoms.get_positions()[sbu_xi]
-            xixidist = numpy.linalg.norm(xixi, axis=1)
-            frag_xi = numpy.argmin(xixidist)
-            # calculate the scaling factor for this dummy pair
-            size_frag = numpy.linalg.norm(frag_pos[frag_xi])
-            size_sbu = numpy.linalg.norm(sbu_pos[sbu_xi])
-            # add it, well normalized.
-            alpha += numpy.abs(frag_pos[frag_xi]*size_sbu/size_frag)
-        # un-center the objects
+        # find corresponding dummmies by distance
+        xixidist = cdist(sbu.atoms.positions[is_X], frag_scaled)
+        frag_Xis = numpy.argmin(xixidist, axis=1)
+        # calculate the scaling factor for each dummy pair,
+        # reusing the buffers that are not needed anymore
+        ratio = numpy.divide(size_sbu, size_fragment[frag_Xis], out=size_sbu)
+        # add them, well normalized.
+        scaled = frag_pos[frag_Xis]
+        scaled *= ratio[:, None]
+        alpha = numpy.abs(scaled, out=scaled).sum(axis=0)
+        # un-center the sbu
         sbu.atoms.positions += fragment_cop
-        fragment.positions += fragment_cop
-        # tag the atoms for connection purposes
+        # tag the atoms for connection purposes,
+        # using the scaled version of the fragment
+        fragment = fragment.copy()
+        fragment.positions = frag_scaled + fragment_cop
         sbu.transfer_tags(fragment)
         return sbu, alpha
 
+    def _center_fragment(self,
+                         fragment):
+        """Return the centroid, centered positions and sizes of a fragment.
+
+        The results are computed once per fragment of the current
+        topology and reused on later alignments. They are read-only.
+        """
+        key = id(fragment)
+        # keeping the fragment around guarantees the id is not reused
+        if key in self._fragment_cache:
+            cached_fragment, data = self._fragment_cache[key]
+            if cached_fragment is fragment:
+                return data
+        cop = fragment.positions.mean(axis=0)
+        centered = fragment.positions - cop
+        sizes = numpy.linalg.norm(centered, axis=1)
+        for array in (cop, centered, sizes):
+            array.setflags(write=False)
+        data = (cop, centered, sizes)
+        self._fragment_cache[key] = (fragment, data)
+        return data
+
     def get_vector_space(self,
                          X):
         """Returns a vector space as four points.
@@ -419,18 +461,17 @@ class Autografs(object):
         # initialize
         x0 = X[0]
         # find the point most orthogonal
-        dots1 = [x.dot(x0)for x in X]
-        i1 = numpy.argmin(dots1)
+        dots0 = X.dot(x0)
+        i1 = numpy.argmin(dots0)
         x1 = X[i1]
         # the second point maximizes the same with x1
-        dots2 = [x.dot(x1) for x in X[1:]]
-        i2 = numpy.argmin(dots2)+1
+        dots1 = X.dot(x1)
+        i2 = numpy.argmin(dots1[1:])+1
         x2 = X[i2]
         # we find a third point
-        dots3 = [x.dot(x1)+x.dot(x0)+x.dot(x2) for x in X]
+        dots3 = dots1+dots0+X.dot(x2)
         i3 = numpy.argmin(dots3)
-        x3 = X[i3]
-        vs = numpy.asarray([x0, x1, x2, x3])
+        vs = X[[0, i1, i2, i3]]
         return vs
 
     def list_available_frameworks(self,
@@ -533,8 +574,7 @@ class Autografs(object):
         if sbu_names:
             logger.info("Checking topology compatibility.")
             topologies = []
-            sbu = [SBU(name=n,
-                       atoms=self.sbu[n]) for n in sbu_names]
+            sbu = [self._get_sbu(n) for n in sbu_names]
             for tk in these_topologies_names:
                 tv = self.topologies[tk]
                 if max_size is None or len(tv) > max_size:
@@ -544,18 +584,19 @@ class Autografs(object):
                 if topology is None:
                     continue
                 # For now, no shape compatibilities
-                filled = {shape: False for shape
-                          in topology.get_unique_shapes()}
-                fslots = [topology.has_compatible_slots(s, coercion=coercion)
-                          for s in sbu]
-                for slots in fslots:
-                    for slot in slots:
-                        filled[slot] = True
-                if all(filled.values()):
+                shapes = frozenset(topology.get_unique_shapes())
+                filled = set()
+                for s in sbu:
+                    filled.update(topology.has_compatible_slots(
+                        s, coercion=coercion))
+                    # no need to look further once every shape is filled
+                    if filled >= shapes:
+                        break
+                if filled >= shapes:
                     logger.info(("\tTopology {tk}"
                                  " fully available.").format(tk=tk))
                     topologies.append(tk)
-                elif any(filled.values()) and not full:
+                elif filled and not full:
                     logger.info(("\tTopology {tk}"
                                  " partially available.").format(tk=tk))
                     topologies.append(tk)
@@ -606,21 +647,24 @@ class Autografs(object):
             logger.info(("\tShape analysis of"
                          " {le} available SBU...").format(le=len(self.sbu)))
             for sbuk in sbu_names:
-                sbuv = self.sbu[sbuk]
-                sbu = SBU(name=sbuk,
-                          atoms=sbuv)
+                sbu = self._get_sbu(sbuk)
                 if sbu is None:
                     continue
                 sbu_list.append(sbu)
+            # compatibility only depends on the shape of the sites:
+            # each distinct shape is checked against the SBU once.
+            by_shape = {}
             for sites in topology.equivalent_sites:
                 logger.info(("\tSites considered"
                              " : {s}").format(s=", ".join(map(str, sites))))
                 shape = topology.shapes[sites[0]]
-                for sbu in sbu_list:
-                    is_compatible = sbu.is_compatible(shape, coercion=coercion)
-                    if is_compatible:
-                        logger.info("\t\t|--> {k}".format(k=sbu.name))
-                        av_sbu[tuple(sites)].append(sbu.name)
+                if tuple(shape) not in by_shape:
+                    by_shape[tuple(shape)] = [
+                        sbu.name for sbu in sbu_list
+                        if sbu.is_compatible(shape, coercion=coercion)]
+                for name in by_shape[tuple(shape)]:
+                    logger.info("\t\t|--> {k}".format(k=name))
+                    av_sbu[tuple(sites)].append(name)
             return dict(av_sbu)
         else:
             logger.info("Listing full database of SBU.")
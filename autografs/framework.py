@@ -29,6 +29,54 @@ import autografs.utils.sbu
 logger = logging.getLogger(__name__)
 
 
+def _concatenate(blocks,
+                 cell=None,
+                 pbc=None):
+    """Return the concatenation of Atoms objects.
+
+    Equivalent to summing the blocks one after the other, but
+    every per-atom array is allocated once at its final size and
+    filled block by block.
+
+    Parameters
+    ----------
+    blocks: [ase.Atoms, ...]
+        the objects to concatenate, in order
+    cell: numpy.array, optional
+        the cell of the resulting object
+    pbc: [bool, bool, bool], optional
+        the periodicity of the resulting object
+
+    Returns
+    -------
+    structure: ase.Atoms
+        the concatenated atoms
+    """
+    structure = ase.Atoms(cell=cell, pbc=pbc)
+    total = sum(len(block) for block in blocks)
+    # keep the order in which summing would create the arrays
+    names = list(structure.arrays.keys())
+    for block in blocks:
+        names += [name for name in block.arrays if name not in names]
+    for name in names:
+        template = [block.arrays[name] for block in blocks
+                    if name in block.arrays]
+        if not template:
+            template = [structure.arrays[name]]
+        array = numpy.zeros((total,) + template[0].shape[1:],
+                            dtype=template[0].dtype)
+        offset = 0
+        for block in blocks:
+            end = offset + len(block)
+            if name == "masses":
+                array[offset:end] = block.get_masses()
+            elif name in block.arrays:
+                array[offset:end] = block.arrays[name]
+            offset = end
+        structure.arrays[name] = array
+    return structure
+
+
 class Framework(object):
     """
     The Framework object contain the results of an Autografs run.
@@ -93,6 +141,9 @@ class Framework(object):
         # each SBU at connection time. Necessary for example
         # during iterative functionalization.
         self._todel = defaultdict(list)
+        # indices of the SBU deformed since their last
+        # analysis, reanalyzed at connection time.
+        self._reanalyze = set()
         return None
 
     def __contains__(self,
@@ -148,6 +199,7 @@ class Framework(object):
                              mmtypes=self.process_mmtypes(),
                              bonds=self.process_bonds())
         new._todel = copy.deepcopy(self._todel)
+        new._reanalyze = set(self._reanalyze)
         return new
 
     def set_topology(self,
@@ -261,6 +313,8 @@ class Framework(object):
                                      update=False)
                     s_todel = list(supercell._todel[atom.index])
                     supercell._todel[newidx] = s_todel
+                    if atom.index in supercell._reanalyze:
+                        supercell._reanalyze.add(newidx)
         return supercell
 
     def append(self,
@@ -468,9 +522,8 @@ class Framework(object):
         None
         """
         logger.info("Rotating {idx} by {a}.".format(idx=index, a=angle))
-        xs = [x.position for x in self[index].atoms
-              if x.symbol == "X"]
-        xs = numpy.asarray(xs)
+        is_X, _ = autografs.utils.sbu.get_dummy_mask(self[index].atoms)
+        xs = self[index].atoms.positions[is_X]
         center = xs.mean(axis=0)
         if axis is not None:
             axis /= numpy.linalg.norm(axis)
@@ -506,9 +559,8 @@ class Framework(object):
             self[index].atoms.rotate(v=plane, a=180.0)
             self[index].transfer_tags(self.topology.fragments[index])
         elif self[index].shape[-1] == 2:
-            axis = [x.position for x in self[index].atoms
-                    if x.symbol == "X"]
-            axis = numpy.asarray(axis)
+            is_X, _ = autografs.utils.sbu.get_dummy_mask(self[index].atoms)
+            axis = self[index].atoms.positions[is_X]
             axis = axis[0]-axis[1]
             self[index].atoms.rotate(v=axis, a=180.0)
         else:
@@ -541,6 +593,8 @@ class Framework(object):
         None
         """
         self[index].atoms.positions = self[index].atoms.positions.dot(M)
+        # a general transformation can change the bonding
+        self._reanalyze.add(index)
         fragment = self.topology.fragments[index]
         self[index].transfer_tags(fragment=fragment)
         return None
@@ -637,7 +691,7 @@ class Framework(object):
         fg_cop = fg.atoms.positions.mean(axis=0)
         fg.atoms.positions -= fg_cop
         # check that only one dummy exists
-        xidx = [x.index for x in fg.atoms if x.symbol == "X"]
+        _, xidx = autografs.utils.sbu.get_dummy_mask(fg.atoms)
         assert len(xidx) == 1
         xidx = xidx[0]
         # center the sbu
@@ -700,20 +754,24 @@ class Framework(object):
         framework = self.copy()
         cell = framework.topology.atoms.get_cell()
         pbc = framework.topology.atoms.get_pbc()
-        structure = ase.Atoms(cell=cell, pbc=pbc)
+        blocks = []
         for idx, sbu in framework:
             atoms = sbu.atoms.copy()
             todel = framework._todel[idx]
+            # bonds and mmtypes are already known for intact sbu,
+            # only the trimmed or deformed ones need a new analysis
             if len(todel) > 0:
                 del atoms[todel]
-            framework[idx].set_atoms(atoms, analyze=True)
-            structure += atoms
+            if len(todel) > 0 or idx in framework._reanalyze:
+                framework[idx].set_atoms(atoms, analyze=True)
+            blocks.append(atoms)
+        structure = _concatenate(blocks, cell=cell, pbc=pbc)
         bonds = framework.process_bonds()
         mmtypes = framework.process_mmtypes()
         symbols = numpy.asarray(structure.get_chemical_symbols())
         if not dummies:
             # keep track of dummies
-            xis = [x.index for x in structure if x.symbol == "X"]
+            xis = list(autografs.utils.sbu.get_dummy_mask(structure)[1])
             tags = structure.get_tags()
             pairs = [numpy.argwhere(tags == tag) for tag in set(tags[xis])]
             for pair in pairs:
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from .context import autografs
+
+import numpy
+import unittest
+
+from ase import Atoms
+
+from autografs.framework import _concatenate
+
+
+class ConcatenateTestSuite(unittest.TestCase):
+    """Concatenation of building units, checked against ASE."""
+
+    def get_blocks(self):
+        """Return blocks with differing per-atom arrays."""
+        b0 = Atoms("CO", positions=[[0, 0, 0], [1.2, 0, 0]], tags=[1, 2])
+        b1 = Atoms("XH2", positions=[[0, 1, 0], [0, 2, 0], [0, 3, 0]])
+        b1.set_masses([1.5, 2.0, 3.0])
+        b2 = Atoms("N", positions=[[0, 0, 4]])
+        b2.set_initial_charges([-0.5])
+        return [b0, b1, b2]
+
+    def test_concatenate(self):
+        blocks = self.get_blocks()
+        ref = sum([b.copy() for b in blocks], Atoms())
+        res = _concatenate(blocks)
+        self.assertEqual(list(res.arrays.keys()), list(ref.arrays.keys()))
+        for name, array in ref.arrays.items():
+            self.assertEqual(res.arrays[name].dtype, array.dtype)
+            numpy.testing.assert_array_equal(res.arrays[name], array)
+        numpy.testing.assert_array_equal(res.get_masses(), ref.get_masses())
+
+    def test_concatenate_cell(self):
+        cell = numpy.eye(3) * 10.0
+        res = _concatenate(self.get_blocks(), cell=cell, pbc=True)
+        numpy.testing.assert_array_equal(res.get_cell(), cell)
+        self.assertTrue(res.get_pbc().all())
+        self.assertEqual(len(res), 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
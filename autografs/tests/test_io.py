@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from .context import autografs
+
+import os
+import numpy
+import tempfile
+import warnings
+import unittest
+
+from autografs.utils import __data__
+from autografs.utils.io import read_cgd
+
+
+class CgdTestSuite(unittest.TestCase):
+    """Parsing of the cgd topology files."""
+
+    def setUp(self):
+        path = os.path.join(__data__, "topologies", "custom.cgd")
+        self.topologies = read_cgd(path=path)
+
+    def test_names(self):
+        self.assertEqual(sorted(self.topologies.keys()), ["hcb-p1", "sql-p1"])
+
+    def test_sql(self):
+        sql = self.topologies["sql-p1"]
+        self.assertEqual(sql.get_chemical_symbols(),
+                         ["Be", "X", "X", "He", "He"])
+        self.assertEqual(list(sql.get_pbc()), [True, True, False])
+        numpy.testing.assert_allclose(sql.cell.cellpar(),
+                                      [1.0, 1.0, 10.0, 90.0, 90.0, 90.0])
+        numpy.testing.assert_allclose(sql.get_scaled_positions(),
+                                      [[0.0, 0.0, 0.0],
+                                       [0.0, 0.25, 0.0],
+                                       [0.0, 0.75, 0.0],
+                                       [0.5, 0.0, 0.0],
+                                       [0.0, 0.5, 0.0]],
+                                      atol=1e-8)
+
+    def test_hcb(self):
+        hcb = self.topologies["hcb-p1"]
+        self.assertEqual(hcb.get_chemical_symbols(),
+                         ["Li", "Li"] + ["X"] * 6 + ["He"] * 3)
+        numpy.testing.assert_allclose(hcb.cell.cellpar(),
+                                      [1.73205, 1.73205, 10.0,
+                                       90.0, 90.0, 120.0],
+                                      atol=1e-4)
+        positions = hcb.get_scaled_positions()
+        # nodes and edge centers
+        numpy.testing.assert_allclose(positions[[0, 1, 8, 9, 10]],
+                                      [[0.33333, 0.66667, 0.0],
+                                       [0.66667, 0.33333, 0.0],
+                                       [0.5, 0.5, 0.0],
+                                       [0.5, 0.0, 0.0],
+                                       [0.0, 0.5, 0.0]],
+                                      atol=1e-4)
+        # dummies sit halfway between a node and an edge center
+        numpy.testing.assert_allclose(positions[2:4],
+                                      [[0.41667, 0.58333, 0.0],
+                                       [0.58333, 0.41667, 0.0]],
+                                      atol=1e-4)
+
+    def test_bad_token(self):
+        path = os.path.join(__data__, "topologies", "custom.cgd")
+        with open(path) as cgd:
+            text = cgd.read()
+        # a trailing non numerical value must fail the topology,
+        # not be dropped silently
+        text = text.replace("CELL 1.0000 1.0000 90.0000",
+                            "CELL 1.0000 1.0000 90.0000 abc")
+        with tempfile.TemporaryDirectory() as tmp:
+            bad = os.path.join(tmp, "bad.cgd")
+            with open(bad, "w") as cgd:
+                cgd.write(text)
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", DeprecationWarning)
+                topologies = read_cgd(path=bad)
+        self.assertEqual(sorted(topologies.keys()), ["hcb-p1"])
+
+
+if __name__ == '__main__':
+    unittest.main()
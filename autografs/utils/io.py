@@ -11,8 +11,11 @@ __status__ = "production"
 
 
 import os
+import re
 import sys
 import numpy
+import functools
+import multiprocessing
 import _pickle as pickle
 
 import ase
@@ -30,18 +33,162 @@ from autografs.utils import __data__
 import logging
 logger = logging.getLogger(__name__)
 
+# the only lines of a cgd file that matter for the topology
+# generation, as (keyword, rest of the line).
+cgd_line = re.compile(r"^[ \t]*(NAME|GROUP|CELL|NODE|EDGE|#[ \t]*EDGE_CENTER)"
+                      r"[ \t]+(.*)$", re.MULTILINE)
+# Hermann-Mauguin symbol and spacegroup number
+groups_line = re.compile(r"^(\S+)[ \t]+(\S+)", re.MULTILINE)
 
-def read_cgd(path=None):
+
+def _parse_topology(topology_raw,
+                    groups):
+    """Return the name and ASE Atoms of a single cgd topology
+
+    Parameters
+    ----------
+    topology_raw: str
+        the text of one topology, between the
+        CRYSTAL and END keywords of a cgd file
+    groups: {str: int, ...}
+        the correspondance between Hermann-Mauguin
+        symbols and ASE spacegroup numbers
+
+    Returns
+    -------
+    (str, ase.Atoms) or None
+        the topology name and atoms, or None if the
+        topology could not be generated
+    """
+    # read from the template.
+    # the edges are easier to comprehend by edge center
+    try:
+        name = None
+        group = None
+        cell = []
+        symbols = []
+        nodes = []
+        for keyword, rest in cgd_line.findall(topology_raw):
+            if keyword == "NAME":
+                name = rest.split()[0]
+                continue
+            elif keyword == "GROUP":
+                group = rest.split()[0]
+                continue
+            elif keyword == "NODE":
+                # node label and coordination come first
+                _, coordination, rest = rest.split(None, 2)
+                symbols.append(chemical_symbols[int(coordination)])
+            # everything else is purely numerical
+            values = numpy.fromstring(rest, dtype=float, sep=" ")
+            # fromstring stops at a bad token instead of raising
+            if values.size != len(rest.split()):
+                raise ValueError("Non numerical value in {0}".format(rest))
+            if keyword == "CELL":
+                cell = values
+            elif keyword == "NODE":
+                nodes.append(values)
+            elif keyword == "EDGE":
+                # now we append some dummies, halfway
+                # between the nodes and the edge center
+                xx = values.reshape(2, -1)
+                com = xx.mean(axis=0)
+                nodes += list(0.5 * (xx + com))
+                symbols += ["X", "X"]
+            else:
+                # linear connector, from the edge center
+                nodes.append(values)
+                symbols.append("He")
+        nodes = numpy.stack(nodes)
+        if len(cell) == 3:
+            # 2D net, only one angle and two vectors.
+            # need to be completed up to 6 parameters
+            pbc = [True, True, False]
+            cell = (list(cell[0:2])
+                    + [10.0, 90.0, 90.0]
+                    + list(cell[2:]))
+            cell = numpy.array(cell, dtype=float)
+            # node coordinates also need to be padded
+            nodes = numpy.pad(nodes, ((0, 0), (0, 1)),
+                              'constant',
+                              constant_values=0.0)
+        elif len(cell) < 3:
+            return None
+        else:
+            pbc = True
+        # now some postprocessing for the space groups
+        setting = 1
+        if ":" in group:
+            # setting might be 2
+            group, setting = group.split(":")
+            try:
+                setting = int(setting.strip())
+            except ValueError:
+                setting = 1
+        # ASE does not have all the spacegroups implemented yet
+        if group not in groups:
+            return None
+        # generate the crystal
+        group = groups[group]
+        topology = crystal(symbols=symbols,
+                           basis=nodes,
+                           spacegroup=group,
+                           setting=setting,
+                           cellpar=cell,
+                           pbc=pbc,
+                           primitive_cell=False,
+                           onduplicates="keep")
+        return name, topology
+    except Exception:
+        return None
+
+
+def _read_topologies_raw(fileobj):
+    """Yield the text of each topology in a cgd file, one at a time
+
+    Parameters
+    ----------
+    fileobj: file
+        the cgd file, opened in binary mode
+
+    Yields
+    ------
+    topology_raw: str
+        the text of one topology, without the
+        CRYSTAL and END keywords
+    """
+    lines = []
+    for line in fileobj:
+        line = line.decode("utf8")
+        while "END" in line:
+            head, line = line.split("END", 1)
+            lines.append(head)
+            yield "".join(lines).strip().strip("CRYSTAL")
+            lines = []
+        lines.append(line)
+    yield "".join(lines).strip().strip("CRYSTAL")
+
+
+def read_cgd(path=None,
+             processes=None):
     """Return a dictionary of topologies as ASE Atoms objects
 
     The format CGD is used mainly by the Systre software
     and by Autografs. All details can be read on the website
     http://rcsr.anu.edu.au/systre
+    Topologies are independent and can be generated in parallel.
 
     Parameters
     ----------
     path: str or Path
         the file path to a .cgd file
+    processes: int, optional
+        if larger than 1, the number of worker processes used to
+        generate the topologies. Under the spawn start method the
+        calling script needs an if __name__ == "__main__" guard.
+        The pool reads blocks ahead of the workers, so all of them
+        may be held in memory at once; only the serial path
+        streams the file one topology at a time.
 
     Returns
     -------
@@ -51,125 +198,51 @@ def read_cgd(path=None):
     """
     root = os.path.join(__data__, "topologies")
     topologies = {}
-    # we need the names of the groups and their
-    # correspondance in ASE spacegroup data this was
-    # compiled using Levenshtein distances and regular expressions
-    groups_file = os.path.join(root, "HermannMauguin.dat")
-    grpf = open(groups_file, "rb")
-    groups = {l.split()[0]: l.split()[1]
-              for l in grpf.read().decode("utf8").splitlines()}
-    grpf.close()
     # read the rcsr topology data
     if path is None:
         topology_file = os.path.join(root, "nets.cgd")
     else:
         topology_file = os.path.abspath(path)
+    # we need the names of the groups and their
+    # correspondance in ASE spacegroup data this was
+    # compiled using Levenshtein distances and regular expressions
+    groups_file = os.path.join(root, "HermannMauguin.dat")
+    with open(groups_file, "rb") as grpf:
+        groups = {k: int(v) for k, v in
+                  groups_line.findall(grpf.read().decode("utf8"))}
     # the script as such starts here
     error_counter = 0
+    topologies_len = 0
     with open(topology_file, "rb") as tpf:
-        text = tpf.read().decode("utf8")
-        # split the file by topology
-        topologies_raw = [t.strip().strip("CRYSTAL")
-                          for t in text.split("END")]
-        topologies_len = len(topologies_raw)
-        logger.info(
-            "{0:<5} topologies before treatment".format(topologies_len))
+        # the file is split by topology while it is read.
+        # a pool may read ahead and keep every block in memory
+        topologies_raw = _read_topologies_raw(tpf)
         # long operation
         logger.info("This might take a few minutes. Time for coffee!")
         logger.info("(")
         logger.info(" )")
         logger.info("[_])")
-        for topology_raw in topologies_raw:
-            # read from the template.
-            # the edges are easier to comprehend by edge center
-            try:
-                lines = topology_raw.splitlines()
-                lines = [l.split() for l in lines if len(l) > 2]
-                name = None
-                group = None
-                cell = []
-                symbols = []
-                nodes = []
-                for l in lines:
-                    if l[0].startswith("NAME"):
-                        name = l[1].strip()
-                    elif l[0].startswith("GROUP"):
-                        group = l[1]
-                    elif l[0].startswith("CELL"):
-                        cell = numpy.array(l[1:], dtype=float)
-                    elif l[0].startswith("NODE"):
-                        this_symbol = chemical_symbols[int(l[2])]
-                        this_node = numpy.array(l[3:], dtype=float)
-                        nodes.append(this_node)
-                        symbols.append(this_symbol)
-                    elif (l[0].startswith("#") and
-                          l[1].startswith("EDGE_CENTER")):
-                        # linear connector
-                        this_node = numpy.array(l[2:], dtype=float)
-                        nodes.append(this_node)
-                        symbols.append("He")
-                    elif l[0].startswith("EDGE"):
-                        # now we append some dummies
-                        s = int((len(l) - 1) / 2)
-                        midl = int((len(l) + 1) / 2)
-                        x0 = numpy.array(l[1:midl],
-                                         dtype=float).reshape(-1, 1)
-                        x1 = numpy.array(l[midl:],
-                                         dtype=float).reshape(-1, 1)
-                        xx = numpy.concatenate([x0, x1], axis=1).T
-                        com = xx.mean(axis=0)
-                        xx -= com
-                        xx = xx.dot(numpy.eye(s) * 0.5)
-                        xx += com
-                        nodes += [xx[0], xx[1]]
-                        symbols += ["X", "X"]
-                nodes = numpy.array(nodes)
-                if len(cell) == 3:
-                    # 2D net, only one angle and two vectors.
-                    # need to be completed up to 6 parameters
-                    pbc = [True, True, False]
-                    cell = (list(cell[0:2])
-                            + [10.0, 90.0, 90.0]
-                            + list(cell[2:]))
-                    cell = numpy.array(cell, dtype=float)
-                    # node coordinates also need to be padded
-                    nodes = numpy.pad(nodes, ((0, 0), (0, 1)),
-                                      'constant',
-                                      constant_values=0.0)
-                elif len(cell) < 3:
+        parse = functools.partial(_parse_topology, groups=groups)
+        if processes is not None and processes > 1:
+            pool = multiprocessing.Pool(processes=processes)
+            # ordered, so that duplicate names resolve as before
+            results = pool.imap(parse, topologies_raw, chunksize=16)
+        else:
+            pool = None
+            results = map(parse, topologies_raw)
+        try:
+            for result in results:
+                topologies_len += 1
+                if result is None:
                     error_counter += 1
                     continue
-                else:
-                    pbc = True
-                # now some postprocessing for the space groups
-                setting = 1
-                if ":" in group:
-                    # setting might be 2
-                    group, setting = group.split(":")
-                    try:
-                        setting = int(setting.strip())
-                    except ValueError:
-                        setting = 1
-                # ASE does not have all the spacegroups implemented yet
-                if group not in groups.keys():
-                    error_counter += 1
-                    continue
-                else:
-                    # generate the crystal
-                    group = int(groups[group])
-                    topology = crystal(symbols=symbols,
-                                       basis=nodes,
-                                       spacegroup=group,
-                                       setting=setting,
-                                       cellpar=cell,
-                                       pbc=pbc,
-                                       primitive_cell=False,
-                                       onduplicates="keep")
-                    # store everything
-                    topologies[name] = topology
-            except Exception:
-                error_counter += 1
-                continue
+                name, topology = result
+                # store everything
+                topologies[name] = topology
+        finally:
+            if pool is not None:
+                pool.terminate()
+    logger.info("{0:<5} topologies treated".format(topologies_len))
     logger.info(("Topologies read with "
                  "{err} errors.").format(err=error_counter))
     return topologies
@@ -46,7 +46,7 @@ def inertia(xyz,
     Ixyz = numpy.array([[Ixx, Ixy, Ixz],
                         [Ixy, Iyy, Iyz],
                         [Ixz, Iyz, Izz]],
-                       dtype=numpy.float32)
+                       dtype=float)
     return Ixyz
 
 
@@ -24,6 +24,7 @@ from ase.neighborlist import NeighborList
 from collections import Counter
 
 from scipy.cluster.hierarchy import fclusterdata as cluster
+from scipy.spatial.distance import cdist
 import warnings
 
 
@@ -35,6 +36,25 @@ from autografs.utils import __data__
 logger = logging.getLogger(__name__)
 
 
+def get_dummy_mask(atoms):
+    """Return the boolean mask and indices of the dummies in atoms.
+
+    Parameters
+    ----------
+    atoms: ase.Atoms
+        the object in which to find the dummies
+
+    Returns
+    -------
+    mask: numpy.array(dtype=bool)
+        True where the atom is a dummy
+    indices: numpy.array(dtype=int)
+        the indices of the dummies
+    """
+    mask = (atoms.get_atomic_numbers() == 0)
+    return mask, numpy.flatnonzero(mask)
+
+
 class SBU(object):
     """Container class for a building unit information
 
@@ -143,7 +163,8 @@ class SBU(object):
         new.set_atoms(atoms=self.get_atoms(), analyze=False)
         new.mmtypes = numpy.copy(self.mmtypes)
         new.bonds = numpy.copy(self.bonds)
-        new.shape = list(self.shape)
+        new.shape = numpy.copy(self.shape)
+        new.pg = self.pg
         return new
 
     def is_compatible(self,
@@ -206,7 +227,10 @@ class SBU(object):
 
     def _analyze(self):
         """Guesses the mmtypes, bonds and pointgroup"""
-        dummies = ase.Atoms([x for x in self.atoms if x.symbol == "X"])
+        is_X, _ = get_dummy_mask(self.atoms)
+        dummies = ase.Atoms(symbols=self.atoms.numbers[is_X],
+                            positions=self.atoms.positions[is_X],
+                            tags=self.atoms.get_tags()[is_X])
         if len(dummies) > 0:
             pg = symmetry.PointGroup(mol=dummies.copy(), tol=0.1)
             max_order = min(8, len(dummies))
@@ -222,16 +246,22 @@ class SBU(object):
     def transfer_tags(self,
                       fragment):
         """Transfer tags between an aligned fragment and the SBU"""
-        # we keep a record of used tags.
-        unused = [x.index for x in self.atoms if x.symbol == "X"]
-        for atom in fragment:
-            ids = [s.index for s in self.atoms if s.index in unused]
-            pf = atom.position
-            ps = self.atoms.positions[unused]
-            d = numpy.linalg.norm(ps - pf, axis=1)
-            si = ids[numpy.argmin(d)]
-            self.atoms[si].tag = atom.tag
-            unused.remove(si)
+        is_X, sbu_Xis = get_dummy_mask(self.atoms)
+        # every fragment point needs its own dummy
+        if len(fragment) > len(sbu_Xis):
+            raise ValueError(("Fragment has {0} points but {1} has only "
+                              "{2} dummies.").format(len(fragment),
+                                                     self.name,
+                                                     len(sbu_Xis)))
+        # all fragment to dummy distances in one go
+        d = cdist(fragment.positions, self.atoms.positions[is_X])
+        tags = self.atoms.get_tags()
+        for fi, tag in enumerate(fragment.get_tags()):
+            si = numpy.argmin(d[fi])
+            tags[sbu_Xis[si]] = tag
+            # we keep a record of used tags.
+            d[:, si] = numpy.inf
+        self.atoms.set_tags(tags)
         return None
 
 
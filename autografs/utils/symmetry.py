@@ -48,6 +48,8 @@ class PointGroup(object):
         """
         self.tol = tol
         self.etol = self.tol / 3.0
+        # squared tolerance, to test lengths without a sqrt
+        self.tol2 = self.tol ** 2
         self.mol = mol
         # center molecule
         self.mol.positions -= self.mol.positions.mean(axis=0)
@@ -230,8 +232,8 @@ class PointGroup(object):
                             if self.nrot > 1:
                                 symmop = ("d", normal, op)
                                 for prev_order, prev_axis, prev_op in self.symmops["C"]:
-                                    if not numpy.linalg.norm(
-                                            prev_axis - axis) < self.tol:
+                                    d = prev_axis - axis
+                                    if not d.dot(d) < self.tol2:
                                         if numpy.dot(prev_axis,
                                                      normal) < self.tol:
                                             symmop = ("v", normal, op)
@@ -254,7 +256,7 @@ class PointGroup(object):
         """
         def not_on_axis(index):
             v = numpy.cross(self.mol.positions[index], axis)
-            return numpy.linalg.norm(v) > self.tol
+            return v.dot(v) > self.tol2
         valid_sets = []
         numbers = self.mol.get_atomic_numbers()
         dists = numpy.linalg.norm(
@@ -301,7 +303,7 @@ class PointGroup(object):
         found = False
         for s1, s2 in itertools.combinations(min_set, 2):
             test_axis = numpy.cross(s1 - s2, axis)
-            if numpy.linalg.norm(test_axis) > self.tol:
+            if test_axis.dot(test_axis) > self.tol2:
                 op = rotation(axis=test_axis, order=2)
                 if is_valid_op(self.mol, op):
                     self.symmops["C"] += [(2, test_axis, op), ]
@@ -354,7 +356,7 @@ class PointGroup(object):
             for cc1, cc2 in itertools.combinations([c1, c2, c3], 2):
                 if not rot_present[2]:
                     test_axis = cc1 + cc2
-                    if numpy.linalg.norm(test_axis) > self.tol:
+                    if test_axis.dot(test_axis) > self.tol2:
                         op = rotation(axis=test_axis, order=2)
                         if is_valid_op(self.mol, op):
                             logger.debug("Found axis with order {0}".format(2))
@@ -363,7 +365,7 @@ class PointGroup(object):
                             self.nrot += 1
 
             test_axis = numpy.cross(c2 - c1, c3 - c1)
-            if numpy.linalg.norm(test_axis) > self.tol:
+            if test_axis.dot(test_axis) > self.tol2:
                 for order in (3, 4, 5):
                     if not rot_present[order]:
                         op = rotation(axis=test_axis, order=order)
@@ -333,7 +333,8 @@ def download_topologies():
 
 def read_topologies_database(update=False,
                              path=None,
-                             use_defaults=True):
+                             use_defaults=True,
+                             processes=None):
     """Return a dictionary of topologies as ASE Atoms.
 
     Parameters
@@ -346,6 +347,9 @@ def read_topologies_database(update=False,
     use_defaults: bool
         if True, loads the default autografs library of
         topologies.
+    processes: int, optional
+        number of worker processes used to generate the
+        topologies when the database is rebuilt. Serial if None.
 
     Returns
     -------
@@ -363,11 +367,11 @@ def read_topologies_database(update=False,
             download_topologies()
         if use_defaults:
             logger.info("Loading the topologies from RCSR default library")
-            topologies_tmp = read_cgd(path=None)
+            topologies_tmp = read_cgd(path=None, processes=processes)
             topologies.update(topologies_tmp)
         if path is not None:
             logger.info("Loading the topologies from {0}".format(path))
-            topologies_tmp = read_cgd(path=path)
+            topologies_tmp = read_cgd(path=path, processes=processes)
             topologies.update(topologies_tmp)
         topologies_len = len(topologies)
         logger.info("{0:<5} topologies saved".format(topologies_len))
@@ -386,4 +390,5 @@ if __name__ == "__main__":
     # update everything
     topologies = read_topologies_database(update=True,
                                           path=None,
-                                          use_defaults=True)
+                                          use_defaults=True,
+                                          processes=os.cpu_count())